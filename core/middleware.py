@@ -1,23 +1,26 @@
-import uuid
+import os
+from django.conf import settings
 from django.utils.deprecation import MiddlewareMixin
 
 
 class RequestIDMiddleware(MiddlewareMixin):
     def process_request(self, request):
-        request.request_id = str(uuid.uuid4())
+        # 128 random bits as hex; avoids building a UUID object per request
+        request.request_id = os.urandom(16).hex()
+
+    def process_template_response(self, request, response):
+        # Added request_id to DRF response body data before it is rendered,
+        # so the body is serialized exactly once
+        if getattr(settings, "REQUEST_ID_IN_BODY", True) and hasattr(request, 'request_id'):
+            # Check if data is mutable (dict)
+            if isinstance(getattr(response, 'data', None), dict):
+                response.data = {"request_id": request.request_id, **response.data}
+
+        return response
 
     def process_response(self, request, response):
         # Added request_id to response headers
         if hasattr(request, 'request_id'):
             response['X-Request-ID'] = request.request_id
-        
-        # Added request_id to DRF response body data
-        if hasattr(response, 'data') and hasattr(request, 'request_id'):
-            # Check if data is mutable (dict)
-            if isinstance(response.data, dict):
-                response.data = {"request_id": request.request_id, **response.data}
-                # Re-render the response to include the modified data
-                response._is_rendered = False
-                response.render()
-        
-        return response
\ No newline at end of file
+
+        return response
@@ -85,6 +85,10 @@ DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.sqlite3",
         "NAME": BASE_DIR / "db.sqlite3",
+        # Keep connections open between requests/tasks instead of reconnecting
+        # every time, and check a reused connection is still alive first
+        "CONN_MAX_AGE": 60,
+        "CONN_HEALTH_CHECKS": True,
     }
 }
 
@@ -155,6 +159,10 @@ REST_FRAMEWORK = {
         "rest_framework.permissions.IsAuthenticatedOrReadOnly",
     ],
 }
+# Include the request ID in JSON response bodies (it is always sent as the
+# X-Request-ID header)
+REQUEST_ID_IN_BODY = True
+
 # Simple JWT Configuration
 SIMPLE_JWT = {
     "AUTH_HEADER_TYPES": ("JWT",),
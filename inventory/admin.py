@@ -30,6 +30,8 @@ class ProductAdmin(admin.ModelAdmin):
 @admin.register(Reservation)
 class ReservationAdmin(admin.ModelAdmin):
     list_display = ("id", "product", "user", "quantity", "expires_at", "created_at")
+    # user is nullable, so the admin's default select_related() would skip it
+    list_select_related = ("product", "user")
     readonly_fields = ("id", "created_at")
 
 # Admin for Order model
@@ -45,6 +47,7 @@ class OrderAdmin(admin.ModelAdmin):
         "status",
         "created_at",
     )
+    list_select_related = ("product", "user")
     list_filter = ("status", "created_at")
     readonly_fields = ("id", "created_at", "updated_at", "total")
 
@@ -54,3 +57,5 @@ class AuditLogAdmin(admin.ModelAdmin):
     list_display = ("id", "actor", "action", "object_type", "object_id", "timestamp")
     list_filter = ("action", "object_type", "timestamp")
     readonly_fields = ("id", "timestamp")
+    # Skip the unfiltered COUNT(*) on the (large) audit table
+    show_full_result_count = False
@@ -1,15 +1,25 @@
+from datetime import datetime, time, timedelta, timezone as dt_timezone
 import django_filters
+from django.utils import timezone
 from .models import Order
 
+
+# Start of a day in the current timezone, as a UTC datetime. Returns None when
+# the boundary falls outside datetime's range (e.g. 0001-01-01 in a UTC+ zone,
+# or the day after 9999-12-31); every stored row is inside such a bound.
+def start_of_day(value, days=0):
+    try:
+        day = datetime.combine(value + timedelta(days=days), time.min)
+        return timezone.make_aware(day).astimezone(dt_timezone.utc)
+    except OverflowError:
+        return None
+
+
 # FilterSet for Order model to enable filtering based on various fields
 class OrderFilter(django_filters.FilterSet):
-    start_date = django_filters.DateFilter(
-        field_name="created_at__date", lookup_expr="gte"
-    )
-    end_date = django_filters.DateFilter(
-        field_name="created_at__date", lookup_expr="lte"
-    )
-    status = django_filters.CharFilter(field_name="status", lookup_expr="iexact")
+    start_date = django_filters.DateFilter(method="filter_start_date")
+    end_date = django_filters.DateFilter(method="filter_end_date")
+    status = django_filters.CharFilter(method="filter_status")
     min_total = django_filters.NumberFilter(field_name="total", lookup_expr="gte")
     max_total = django_filters.NumberFilter(field_name="total", lookup_expr="lte")
     sort = django_filters.OrderingFilter(
@@ -25,6 +35,25 @@ class OrderFilter(django_filters.FilterSet):
         },
     )
 
+    # Compare created_at against day boundaries instead of casting every row
+    # to a date (created_at__date), so the created_at indexes can be used
+    def filter_start_date(self, queryset, name, value):
+        bound = start_of_day(value)
+        if bound is None:
+            return queryset
+        return queryset.filter(created_at__gte=bound)
+
+    def filter_end_date(self, queryset, name, value):
+        bound = start_of_day(value, days=1)
+        if bound is None:
+            return queryset
+        return queryset.filter(created_at__lt=bound)
+
+    def filter_status(self, queryset, name, value):
+        # Stored statuses are lowercase, so normalise the input and use an exact
+        # (index-usable) match instead of a per-row LOWER() from iexact
+        return queryset.filter(status=value.lower())
+
     class Meta:
         model = Order
         fields = [
@@ -1,5 +1,6 @@
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
 from django.core.management.base import BaseCommand
-from django.utils import timezone
 from django.db import transaction
 from inventory.models import Reservation, Product, AuditLog
 
@@ -8,40 +9,64 @@ class Command(BaseCommand):
     help = "Cleanup expired reservations"
 
     def handle(self, *args, **options):
-        expired_reservations = Reservation.objects.filter(expires_at__lt=timezone.now())
-        count = 0
-        for reservation in expired_reservations:
-            with transaction.atomic():
-                product = Product.objects.select_for_update().get(
-                    id=reservation.product.id
-                )
+        # USE_TZ is on, so a direct UTC clock read matches timezone.now()
+        now = datetime.now(dt_timezone.utc)
+        with transaction.atomic():
+            # Lock the expired rows so a concurrent run cannot release them twice
+            expired = list(
+                Reservation.objects.select_for_update()
+                .filter(expires_at__lt=now)
+                .values("id", "product_id", "quantity")
+            )
+
+            # Total expired quantity per product
+            totals = defaultdict(int)
+            for reservation in expired:
+                totals[reservation["product_id"]] += reservation["quantity"]
+
+            # Lock every affected product with a single query
+            products = Product.objects.select_for_update().filter(id__in=totals).in_bulk()
+            logs = []
+            for product_id, quantity in totals.items():
+                product = products[product_id]
                 # Release reserved stock back to available
-                released_quantity = min(reservation.quantity, product.reserved_stock)
+                released_quantity = min(quantity, product.reserved_stock)
                 old_available = product.available_stock
                 old_reserved = product.reserved_stock
                 product.available_stock += released_quantity
                 product.reserved_stock -= released_quantity
-                product.save()
+                product.updated_at = now
 
                 # Audit log for stock adjustment
-                AuditLog.objects.create(
-                    actor="System",
-                    action="stock_adjusted",
-                    object_type="Product",
-                    object_id=product.id,
-                    old_value={"available_stock": old_available, "reserved_stock": old_reserved},
-                    new_value={"available_stock": product.available_stock, "reserved_stock": product.reserved_stock},
+                logs.append(
+                    AuditLog(
+                        actor="System",
+                        action="stock_adjusted",
+                        object_type="Product",
+                        object_id=product.id,
+                        old_available=old_available,
+                        old_reserved=old_reserved,
+                        new_available=product.available_stock,
+                        new_reserved=product.reserved_stock,
+                    )
                 )
-                # Audit log for expired reservation
-                AuditLog.objects.create(
+            Product.objects.bulk_update(
+                products.values(), ["available_stock", "reserved_stock", "updated_at"]
+            )
+
+            # Audit log for expired reservations
+            logs.extend(
+                AuditLog(
                     actor="System",
                     action="reservation_expired",
                     object_type="Reservation",
-                    object_id=reservation.id,
-                    old_value={"status": "active"},
-                    new_value={"status": "expired"},
+                    object_id=reservation["id"],
+                    old_status="active",
+                    new_status="expired",
                 )
+                for reservation in expired
+            )
+            AuditLog.objects.bulk_create(logs, batch_size=1000)
 
-                reservation.delete()
-                count += 1
-        self.stdout.write(f"Cleaned up {count} expired reservations")
+            Reservation.objects.filter(id__in=[r["id"] for r in expired]).delete()
+        self.stdout.write(f"Cleaned up {len(expired)} expired reservations")
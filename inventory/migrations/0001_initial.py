@@ -0,0 +1,89 @@
+# Generated by Django 5.2.9 on 2026-10-15 20:39
+
+import django.db.models.deletion
+import django.db.models.expressions
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='AuditLog',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('actor', models.CharField(default='System', max_length=255)),
+                ('action', models.CharField(max_length=255)),
+                ('object_type', models.CharField(max_length=255)),
+                ('object_id', models.PositiveIntegerField()),
+                ('old_value', models.JSONField(blank=True, null=True)),
+                ('new_value', models.JSONField(blank=True, null=True)),
+                ('old_status', models.CharField(blank=True, max_length=20, null=True)),
+                ('new_status', models.CharField(blank=True, max_length=20, null=True)),
+                ('old_available', models.PositiveIntegerField(blank=True, null=True)),
+                ('new_available', models.PositiveIntegerField(blank=True, null=True)),
+                ('old_reserved', models.PositiveIntegerField(blank=True, null=True)),
+                ('new_reserved', models.PositiveIntegerField(blank=True, null=True)),
+                ('timestamp', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['timestamp'], name='inventory_a_timesta_628f6b_idx'), models.Index(fields=['action'], name='inventory_a_action_d6359b_idx'), models.Index(fields=['object_type'], name='inventory_a_object__23fd46_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Product',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=255)),
+                ('price', models.DecimalField(decimal_places=2, default=0.0, max_digits=10)),
+                ('total_stock', models.PositiveIntegerField()),
+                ('available_stock', models.PositiveIntegerField()),
+                ('reserved_stock', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['name'], name='inventory_p_name_f6a6a1_idx')],
+                'constraints': [models.CheckConstraint(condition=models.Q(('total_stock', django.db.models.expressions.CombinedExpression(models.F('available_stock'), '+', models.F('reserved_stock')))), name='stock_invariant')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Order',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('total', models.DecimalField(decimal_places=2, max_digits=10)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('confirmed', 'Confirmed'), ('processing', 'Processing'), ('shipped', 'Shipped'), ('delivered', 'Delivered'), ('cancelled', 'Cancelled')], default='pending', max_length=20)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['created_at', 'id'], name='order_created_id_idx'), models.Index(fields=['total', 'id'], name='order_total_id_idx'), models.Index(fields=['status', '-created_at'], name='order_status_created_idx'), models.Index(condition=models.Q(('status__in', ['pending', 'confirmed', 'processing'])), fields=['created_at'], name='order_active_idx')],
+            },
+        ),
+        migrations.CreateModel(
+            name='Reservation',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('quantity', models.PositiveIntegerField()),
+                ('expires_at', models.DateTimeField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='inventory.product')),
+                ('user', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['expires_at'], name='res_expires_idx')],
+            },
+        ),
+    ]
@@ -1,3 +1,4 @@
+from datetime import datetime, timezone as dt_timezone
 from django.db import models
 from django.contrib.auth.models import User
 from django.utils import timezone
@@ -20,16 +21,29 @@ class Product(models.Model):
         indexes = [
             models.Index(fields=["name"]),
         ]
+        constraints = [
+            # Enforced by the database too, so queryset.update() and
+            # bulk_update() writes cannot break the invariant
+            models.CheckConstraint(
+                condition=models.Q(
+                    total_stock=models.F("available_stock") + models.F("reserved_stock")
+                ),
+                name="stock_invariant",
+            ),
+        ]
 
     def save(self, *args, **kwargs):
-        # Handle None values during creation
-        if self.available_stock is None:
-            self.available_stock = self.total_stock - self.reserved_stock
+        if self._state.adding:
+            # Handle None values during creation
+            if self.available_stock is None:
+                self.available_stock = self.total_stock - self.reserved_stock
 
-        # Ensure non-negative values
-        self.available_stock = max(0, self.available_stock)
-        self.reserved_stock = max(0, self.reserved_stock)
+            # Ensure non-negative values
+            self.available_stock = max(0, self.available_stock)
+            self.reserved_stock = max(0, self.reserved_stock)
 
+        # One integer comparison, before any SQL; the stock_invariant
+        # constraint guards the update()/bulk_update() paths that skip save()
         if self.available_stock + self.reserved_stock != self.total_stock:
             raise ValueError(
                 "Invariant violated: available_stock + reserved_stock must equal total_stock"
@@ -51,11 +65,14 @@ class Reservation(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["expires_at"]),
+            # Finds expired reservations for the cleanup with an expires_at
+            # range scan. The cleanup reads id and locks the rows, so it visits
+            # the table either way; extra key columns would not save that
+            models.Index(fields=["expires_at"], name="res_expires_idx"),
         ]
 
     def is_expired(self):
-        return timezone.now() > self.expires_at
+        return datetime.now(dt_timezone.utc) > self.expires_at
 
     def __str__(self):
         return f"Reservation {self.id} for {self.product.name}"
@@ -73,12 +90,12 @@ class Order(models.Model):
     ]
 
     TRANSITIONS = {
-        "pending": ["confirmed", "cancelled"],
-        "confirmed": ["processing", "cancelled"],
-        "processing": ["shipped"],
-        "shipped": ["delivered"],
-        "delivered": [],
-        "cancelled": [],
+        "pending": frozenset({"confirmed", "cancelled"}),
+        "confirmed": frozenset({"processing", "cancelled"}),
+        "processing": frozenset({"shipped"}),
+        "shipped": frozenset({"delivered"}),
+        "delivered": frozenset(),
+        "cancelled": frozenset(),
     }
 
     user = models.ForeignKey(User, on_delete=models.CASCADE, blank=True, null=True)
@@ -91,18 +108,106 @@ class Order(models.Model):
 
     class Meta:
         indexes = [
-            models.Index(fields=["created_at"]),
-            models.Index(fields=["status"]),
-            models.Index(fields=["total"]),
-            models.Index(fields=["created_at", "status"]),
+            # Cursor pagination keys: each matches a pagination ordering
+            # including its id tiebreaker (read backwards for the DESC sorts),
+            # and the leading column still serves the date/total range filters
+            models.Index(fields=["created_at", "id"], name="order_created_id_idx"),
+            models.Index(fields=["total", "id"], name="order_total_id_idx"),
+            # Equality column first: status filter + date range / newest sort.
+            # Its status prefix also serves status-only filters, so there is
+            # no separate status index to maintain on every write
+            models.Index(fields=["status", "-created_at"], name="order_status_created_idx"),
+            # Partial index over the small, hot set of orders still in flight
+            models.Index(
+                fields=["created_at"],
+                name="order_active_idx",
+                condition=models.Q(status__in=["pending", "confirmed", "processing"]),
+            ),
         ]
 
     def can_transition_to(self, new_status):
-        return new_status in self.TRANSITIONS.get(self.status, [])
+        return new_status in self.TRANSITIONS.get(self.status, ())
+
+    def _unit_price(self):
+        # Reuse an already loaded product, otherwise fetch only its price
+        if Order.product.is_cached(self):
+            return self.product.price
+        return Product.objects.values_list("price", flat=True).get(pk=self.product_id)
+
+    # Inputs the total is priced from
+    PRICING_FIELDS = ("product_id", "quantity")
+
+    def _snapshot_pricing(self, attnames=PRICING_FIELDS):
+        # Record the pricing inputs currently loaded on the instance; deferred
+        # ones are left out rather than loaded
+        loaded = getattr(self, "_loaded_pricing", {})
+        loaded.update(
+            (attname, self.__dict__[attname])
+            for attname in attnames
+            if attname in self.__dict__
+        )
+        self._loaded_pricing = loaded
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # Remember the loaded pricing inputs so save() can skip repricing
+        instance._snapshot_pricing()
+        return instance
+
+    def refresh_from_db(self, using=None, fields=None, from_queryset=None):
+        super().refresh_from_db(using, fields, from_queryset)
+        # Deferred fields are loaded through here; values read from the
+        # database are unchanged by definition
+        if fields is None:
+            self._snapshot_pricing()
+        else:
+            fields = {
+                self._meta.get_field(name).attname for name in fields
+            }
+            self._snapshot_pricing(
+                [attname for attname in self.PRICING_FIELDS if attname in fields]
+            )
+
+    def _pricing_changed(self):
+        loaded = getattr(self, "_loaded_pricing", None)
+        if loaded is None:
+            return True
+        # A still-deferred input was never loaded, so it can't have changed;
+        # reading it here would load it and look like a change
+        deferred = self.get_deferred_fields()
+        return any(
+            attname not in deferred
+            and (attname not in loaded or getattr(self, attname) != loaded[attname])
+            for attname in self.PRICING_FIELDS
+        )
 
     def save(self, *args, **kwargs):
-        self.total = self.quantity * self.product.price
+        # Only price new orders or orders whose product/quantity changed, so a
+        # status change neither queries the product nor rewrites the total
+        if self._state.adding or self._pricing_changed():
+            self.total = self.quantity * self._unit_price()
         super().save(*args, **kwargs)
+        # The saved total now matches these inputs
+        self._snapshot_pricing()
+
+    @classmethod
+    def bulk_create_orders(cls, orders, batch_size=1000):
+        # Price every order from a single product query, then insert in batches
+        orders = list(orders)
+        product_ids = {order.product_id for order in orders}
+        prices = dict(
+            Product.objects.filter(id__in=product_ids).values_list("id", "price")
+        )
+        missing = product_ids - prices.keys()
+        if missing:
+            raise Product.DoesNotExist(
+                f"Products not found: {', '.join(map(str, sorted(missing)))}"
+            )
+        for order in orders:
+            order.total = order.quantity * prices[order.product_id]
+            order._snapshot_pricing()
+        return cls.objects.bulk_create(orders, batch_size=batch_size)
 
     def __str__(self):
         return f"Order {self.id}"
@@ -118,7 +223,15 @@ class AuditLog(models.Model):
     object_id = models.PositiveIntegerField()
     old_value = models.JSONField(null=True, blank=True)
     new_value = models.JSONField(null=True, blank=True)
-    timestamp = models.DateTimeField(auto_now_add=True)
+    # Typed columns for the fixed-shape events (stock_adjusted,
+    # reservation_expired, order_status_changed); JSON is for everything else
+    old_status = models.CharField(max_length=20, null=True, blank=True)
+    new_status = models.CharField(max_length=20, null=True, blank=True)
+    old_available = models.PositiveIntegerField(null=True, blank=True)
+    new_available = models.PositiveIntegerField(null=True, blank=True)
+    old_reserved = models.PositiveIntegerField(null=True, blank=True)
+    new_reserved = models.PositiveIntegerField(null=True, blank=True)
+    timestamp = models.DateTimeField(default=timezone.now)
 
     class Meta:
         indexes = [
@@ -127,5 +240,25 @@ class AuditLog(models.Model):
             models.Index(fields=["object_type"]),
         ]
 
+    def _value(self, side):
+        # Rebuild the old/new value dict from the typed columns, falling back
+        # to the JSON column for other events and rows written before them
+        status = getattr(self, f"{side}_status")
+        if status is not None:
+            return {"status": status}
+        available = getattr(self, f"{side}_available")
+        if available is not None:
+            return {
+                "available_stock": available,
+                "reserved_stock": getattr(self, f"{side}_reserved"),
+            }
+        return getattr(self, f"{side}_value")
+
+    def get_old_value(self):
+        return self._value("old")
+
+    def get_new_value(self):
+        return self._value("new")
+
     def __str__(self):
         return f"Audit {self.action} on {self.object_type} {self.object_id}"
@@ -3,13 +3,31 @@ from rest_framework.pagination import CursorPagination
 # Custom cursor pagination for Order model
 class OrderCursorPagination(CursorPagination):
     page_size = 10
-    ordering = ["-created_at", "-id"]
+    ordering = ("created_at", "id")  # Default ordering
+
+    # Orderings produced by the view's default and OrderFilter's sort options,
+    # resolved once. The id tiebreaker keeps rows with equal created_at/total
+    # in a stable order, and each ordering has a matching (column, id) index
+    # on Order so pages are read straight off the index.
+    _ORDERINGS = {
+        ("created_at", "id"): ("created_at", "id"),
+        ("created_at",): ("created_at", "id"),
+        ("-created_at",): ("-created_at", "-id"),
+        ("-total",): ("-total", "-id"),
+    }
 
     def paginate_queryset(self, queryset, request, view=None):
         # Set ordering based on the queryset's current order_by to allow dynamic sorting
-        if queryset.query.order_by:
-            self.ordering = [str(f) for f in queryset.query.order_by]
-        else:
-            self.ordering = ["created_at", "id"]  # Default ordering
+        order_by = tuple(queryset.query.order_by)
+        self.ordering = (
+            self._ORDERINGS.get(order_by)
+            or tuple(str(f) for f in order_by)
+            or self.ordering
+        )
 
         return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        # Ordering is already resolved to a tuple above; skip the base class
+        # scan of the view's filter backends and its list -> tuple conversion
+        return self.ordering
@@ -15,7 +15,13 @@ class ProductSerializer(serializers.ModelSerializer):
         model = Product
         fields = "__all__"
 
+    STOCK_FIELDS = frozenset({"available_stock", "reserved_stock", "total_stock"})
+
     def validate(self, attrs):
+        # Updates that touch none of the stock fields cannot break the invariant
+        if not self.STOCK_FIELDS & attrs.keys():
+            return attrs
+
         instance = getattr(self, "instance", None)
         available_stock = attrs.get(
             "available_stock", instance.available_stock if instance else None
@@ -52,6 +58,12 @@ class ReservationReadSerializer(serializers.ModelSerializer):
 
 # Serializer for Reservation model (write operations)
 class ReservationWriteSerializer(serializers.ModelSerializer):
+    # Validation only has to prove the product exists; the view reserves stock
+    # with a conditional UPDATE, so don't load the whole row here
+    product = serializers.PrimaryKeyRelatedField(queryset=Product.objects.only("id"))
+    # PositiveIntegerField would accept 0, which reserves nothing
+    quantity = serializers.IntegerField(min_value=1)
+
     class Meta:
         model = Reservation
         fields = "__all__"
@@ -68,6 +80,36 @@ class OrderReadSerializer(serializers.ModelSerializer):
         fields = "__all__"
 
 
+# Row builder for the order list endpoint. It renders .values() rows in the
+# same shape as OrderReadSerializer without binding a serializer per row.
+ORDER_LIST_VALUES = (
+    "id",
+    "user__username",
+    "product__id",
+    "product__name",
+    "quantity",
+    "total",
+    "status",
+    "created_at",
+    "updated_at",
+)
+_order_total_field = serializers.DecimalField(max_digits=10, decimal_places=2)
+_order_datetime_field = serializers.DateTimeField()
+
+
+def order_list_row(row):
+    return {
+        "id": row["id"],
+        "user": row["user__username"],
+        "product": {"id": row["product__id"], "name": row["product__name"]},
+        "quantity": row["quantity"],
+        "total": _order_total_field.to_representation(row["total"]),
+        "status": row["status"],
+        "created_at": _order_datetime_field.to_representation(row["created_at"]),
+        "updated_at": _order_datetime_field.to_representation(row["updated_at"]),
+    }
+
+
 # Serializers for Order model(write operations)
 class OrderWriteSerializer(serializers.ModelSerializer):
     class Meta:
@@ -78,6 +120,27 @@ class OrderWriteSerializer(serializers.ModelSerializer):
 
 # Serializer for AuditLog model
 class AuditLogSerializer(serializers.ModelSerializer):
+    # Typed columns are exposed through the same old_value/new_value shape
+    old_value = serializers.JSONField(source="get_old_value", read_only=True)
+    new_value = serializers.JSONField(source="get_new_value", read_only=True)
+
     class Meta:
         model = AuditLog
-        fields = "__all__"
+        fields = (
+            "id",
+            "actor",
+            "action",
+            "object_type",
+            "object_id",
+            "old_value",
+            "new_value",
+            "timestamp",
+        )
+
+
+# Serializer for the AuditLog list: skips the old/new payloads, which the
+# list query doesn't load; fetch a single entry to see them
+class AuditLogListSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = AuditLog
+        fields = ("id", "actor", "action", "object_type", "object_id", "timestamp")
@@ -1,39 +1,100 @@
+import logging
+from collections import defaultdict
+from datetime import datetime, timezone as dt_timezone
 from celery import shared_task
 from django.utils import timezone
 from django.db import transaction
 from .models import Reservation, Product, AuditLog
 
+logger = logging.getLogger(__name__)
+
 # Task to clean up expired reservations
 @shared_task
 def cleanup_expired_reservations():
-    expired_reservations = Reservation.objects.filter(expires_at__lt=timezone.now())
-    for reservation in expired_reservations:
-        with transaction.atomic():
-            product = Product.objects.select_for_update().get(id=reservation.product.id)
+    # USE_TZ is on, so a direct UTC clock read matches timezone.now()
+    now = datetime.now(dt_timezone.utc)
+    with transaction.atomic():
+        # Lock the expired rows so a concurrent run cannot release them twice
+        expired = list(
+            Reservation.objects.select_for_update()
+            .filter(expires_at__lt=now)
+            .values("id", "product_id", "quantity")
+        )
+
+        # Total expired quantity per product
+        totals = defaultdict(int)
+        for reservation in expired:
+            totals[reservation["product_id"]] += reservation["quantity"]
+
+        # Lock every affected product with a single query
+        products = Product.objects.select_for_update().filter(id__in=totals).in_bulk()
+        logs = []
+        for product_id, quantity in totals.items():
+            product = products[product_id]
+            released_quantity = min(quantity, product.reserved_stock)
             old_available = product.available_stock
             old_reserved = product.reserved_stock
-            product.available_stock += reservation.quantity
-            product.reserved_stock -= reservation.quantity
-            product.save()
+            product.available_stock += released_quantity
+            product.reserved_stock -= released_quantity
+            product.updated_at = now
 
             # Audit log for stock adjustment
-            AuditLog.objects.create(
-                actor="System",
-                action="stock_adjusted",
-                object_type="Product",
-                object_id=product.id,
-                old_value={"available_stock": old_available, "reserved_stock": old_reserved},
-                new_value={"available_stock": product.available_stock, "reserved_stock": product.reserved_stock},
+            logs.append(
+                AuditLog(
+                    actor="System",
+                    action="stock_adjusted",
+                    object_type="Product",
+                    object_id=product.id,
+                    old_available=old_available,
+                    old_reserved=old_reserved,
+                    new_available=product.available_stock,
+                    new_reserved=product.reserved_stock,
+                )
             )
+        Product.objects.bulk_update(
+            products.values(), ["available_stock", "reserved_stock", "updated_at"]
+        )
 
-            # Audit log for expired reservation
-            AuditLog.objects.create(
+        # Audit log for expired reservations
+        logs.extend(
+            AuditLog(
                 actor="System",  # System action
                 action="reservation_expired",
                 object_type="Reservation",
-                object_id=reservation.id,
-                old_value={"status": "active"},
-                new_value={"status": "expired"},
+                object_id=reservation["id"],
+                old_status="active",
+                new_status="expired",
             )
+            for reservation in expired
+        )
+        AuditLog.objects.bulk_create(logs, batch_size=1000)
+
+        Reservation.objects.filter(id__in=[r["id"] for r in expired]).delete()
+
+
+# Task to write audit log entries queued by the API views
+@shared_task
+def write_audit_logs(entries):
+    AuditLog.objects.bulk_create([AuditLog(**entry) for entry in entries])
+
+
+# Queue audit log entries (AuditLog field dicts) to be written by a worker
+# once the current transaction commits, keeping the INSERT off the request path
+def queue_audit_logs(entries):
+    # Stamp entries now so the log keeps the event time, not the write time
+    timestamp = timezone.now().isoformat()
+    for entry in entries:
+        entry.setdefault("timestamp", timestamp)
+
+    def dispatch():
+        # Runs after the stock change has committed, so a failure here must not
+        # turn into an error response the client would retry
+        try:
+            write_audit_logs.delay(entries)
+        except Exception:
+            # Broker unavailable or misconfigured: write inline rather than
+            # lose the audit trail
+            logger.exception("Could not queue audit log entries; writing inline")
+            write_audit_logs(entries)
 
-            reservation.delete()
+    transaction.on_commit(dispatch)
@@ -1,8 +1,17 @@
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db import IntegrityError, connection, transaction
 from django.utils import timezone
 from datetime import timedelta
+from io import StringIO
+import json
+from unittest import mock
+from kombu.exceptions import OperationalError
 from .models import Product, Reservation, Order, AuditLog
+from .serializers import AuditLogSerializer, OrderReadSerializer
+from .tasks import cleanup_expired_reservations, write_audit_logs
 from rest_framework.test import APITestCase
 from rest_framework import status
 from django.urls import reverse
@@ -19,6 +28,25 @@ class ProductModelTest(TestCase):
         with self.assertRaises(ValueError):
             product.save()
 
+    def test_invariant_enforced_by_database(self):
+        product = Product.objects.create(
+            name="Test", total_stock=10, available_stock=10, reserved_stock=0
+        )
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Product.objects.filter(id=product.id).update(available_stock=9)
+
+    def test_save_checks_invariant_without_extra_queries(self):
+        product = Product.objects.create(
+            name="Test", total_stock=10, available_stock=10, reserved_stock=0
+        )
+        product.name = "Renamed"
+        with self.assertNumQueries(1):  # the UPDATE alone
+            product.save()
+        # A violation is rejected before any SQL, leaving the transaction usable
+        product.available_stock = 5
+        with self.assertNumQueries(0), self.assertRaises(ValueError):
+            product.save()
+
 # Tests for Product Serializer
 class ProductSerializerTest(TestCase):
     def test_valid_data(self):
@@ -102,6 +130,109 @@ class OrderModelTest(TestCase):
         )
         self.assertFalse(order.can_transition_to("cancelled"))
 
+    def test_total_from_product_id_fetches_only_price(self):
+        self.product.price = 2.50
+        self.product.save()
+        order = Order(user=self.user, product_id=self.product.id, quantity=4)
+        with self.assertNumQueries(2):  # price lookup + INSERT
+            order.save()
+        self.assertEqual(order.total, 10)
+
+    def test_status_change_keeps_total(self):
+        self.product.price = 10
+        self.product.save()
+        order = Order.objects.create(user=self.user, product=self.product, quantity=2)
+        Product.objects.filter(id=self.product.id).update(price=99)
+
+        order = Order.objects.get(id=order.id)
+        order.status = "confirmed"
+        with self.assertNumQueries(1):  # UPDATE only, no price lookup
+            order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total, 20)
+
+        order.quantity = 3
+        order.save()
+        self.assertEqual(order.total, 297)
+
+    def test_status_change_with_deferred_pricing_keeps_total(self):
+        self.product.price = 10
+        self.product.save()
+        order = Order.objects.create(user=self.user, product=self.product, quantity=2)
+        Product.objects.filter(id=self.product.id).update(price=99)
+
+        order = Order.objects.only("id", "status").get(id=order.id)
+        order.status = "confirmed"
+        with self.assertNumQueries(1):  # UPDATE of the loaded fields only
+            order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.status, "confirmed")
+        self.assertEqual(order.total, 20)
+
+        # Lazily loading a deferred input doesn't count as changing it...
+        order = Order.objects.only("id", "status").get(id=order.id)
+        self.assertEqual(order.quantity, 2)
+        order.status = "processing"
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total, 20)
+
+        # ...but setting one does
+        order = Order.objects.only("id", "status").get(id=order.id)
+        order.quantity = 1
+        order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total, 99)
+
+    def test_saved_instance_keeps_total_on_later_status_change(self):
+        self.product.price = 10
+        self.product.save()
+        order = Order(user=self.user, product_id=self.product.id, quantity=2)
+        order.save()
+        Product.objects.filter(id=self.product.id).update(price=99)
+
+        # A freshly created instance is not repriced on its next save
+        order.status = "confirmed"
+        with self.assertNumQueries(1):
+            order.save()
+        self.assertEqual(order.total, 20)
+
+        # Nor is an instance whose quantity change was already priced
+        Product.objects.filter(id=self.product.id).update(price=10)
+        order = Order.objects.get(id=order.id)
+        order.quantity = 3
+        order.save()
+        self.assertEqual(order.total, 30)
+        Product.objects.filter(id=self.product.id).update(price=99)
+        order.status = "processing"
+        with self.assertNumQueries(1):
+            order.save()
+        order.refresh_from_db()
+        self.assertEqual(order.total, 30)
+
+    def test_bulk_create_orders(self):
+        self.product.price = 3
+        self.product.save()
+        other = Product.objects.create(
+            name="Other", price=5, total_stock=10, available_stock=10, reserved_stock=0
+        )
+        orders = [
+            Order(user=self.user, product_id=self.product.id, quantity=2),
+            Order(user=self.user, product_id=other.id, quantity=1),
+        ]
+        with self.assertNumQueries(2):  # one price query + one INSERT
+            Order.bulk_create_orders(orders)
+        self.assertEqual(
+            sorted(Order.objects.values_list("total", flat=True)), [5, 6]
+        )
+
+        # Unknown products are reported by id and nothing is inserted
+        with self.assertRaisesMessage(Product.DoesNotExist, f"{other.id + 100}"):
+            Order.bulk_create_orders(
+                [Order(user=self.user, product_id=other.id + 100, quantity=1)]
+            )
+        self.assertEqual(Order.objects.count(), 2)
+
 # Tests for Reservation API
 class ReservationAPITest(APITestCase):
     def setUp(self):
@@ -113,17 +244,96 @@ class ReservationAPITest(APITestCase):
 
     def test_create_reservation_success(self):
         data = {"product": self.product.id, "quantity": 5}
-        response = self.client.post(reverse("reservation-list"), data)
+        # Run the queued audit task inline once the request's transaction commits
+        with mock.patch.object(write_audit_logs, "delay", write_audit_logs):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("reservation-list"), data)
         self.assertEqual(response.status_code, status.HTTP_201_CREATED)
         self.assertIn("request_id", response.data)
         self.product.refresh_from_db()
         self.assertEqual(self.product.available_stock, 5)
         self.assertEqual(self.product.reserved_stock, 5)
+        self.assertEqual(
+            sorted(AuditLog.objects.values_list("action", flat=True)),
+            ["reservation_created", "stock_adjusted"],
+        )
+        # Both entries carry the actor resolved once for the request
+        self.assertEqual(
+            set(AuditLog.objects.values_list("actor", flat=True)), {"test@example.com"}
+        )
+        log = AuditLog.objects.get(action="stock_adjusted")
+        self.assertEqual(log.get_old_value(), {"available_stock": 10, "reserved_stock": 0})
+        self.assertEqual(log.get_new_value(), {"available_stock": 5, "reserved_stock": 5})
+
+    def test_audit_dispatch_failure_keeps_201(self):
+        data = {"product": self.product.id, "quantity": 1}
+        # Any error queueing the task (not just a broker outage) falls back to
+        # an inline write; the reservation is committed, so it must not 500
+        with mock.patch.object(
+            write_audit_logs, "delay", side_effect=AttributeError("no redis")
+        ), self.assertLogs("inventory.tasks", "ERROR"):
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse("reservation-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_audit_logs_deferred_until_commit(self):
+        data = {"product": self.product.id, "quantity": 2}
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post(reverse("reservation-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Nothing is written while the stock row is locked; one dispatch is queued
+        self.assertFalse(AuditLog.objects.exists())
+        self.assertEqual(len(callbacks), 1)
+
+    def test_create_reservation_invalid_input(self):
+        for data in (
+            {"product": self.product.id},
+            {"product": self.product.id, "quantity": "abc"},
+            {"product": self.product.id, "quantity": 0},
+            {"quantity": 1},
+            {"product": self.product.id + 100, "quantity": 1},
+        ):
+            with self.subTest(data):
+                response = self.client.post(reverse("reservation-list"), data)
+                self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.available_stock, 10)
+        self.assertFalse(Reservation.objects.exists())
+
+    def test_create_reservation_reads_narrow_product_columns(self):
+        data = {"product": self.product.id, "quantity": 1}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("reservation-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # Stock is reserved by a conditional UPDATE; the serializer's product
+        # lookup and the audit read-back project only what they need
+        product_reads = [
+            q["sql"] for q in ctx.captured_queries
+            if q["sql"].startswith("SELECT") and 'FROM "inventory_product"' in q["sql"]
+        ]
+        self.assertTrue(product_reads)
+        for sql in product_reads:
+            self.assertNotIn('"inventory_product"."total_stock"', sql)
+
+    def test_create_reservation_updates_only_stock_columns(self):
+        data = {"product": self.product.id, "quantity": 1}
+        with CaptureQueriesContext(connection) as ctx:
+            response = self.client.post(reverse("reservation-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        # The stock change writes only the stock columns, not the whole row
+        (update,) = [q["sql"] for q in ctx.captured_queries if q["sql"].startswith("UPDATE")]
+        self.assertNotIn('"name"', update)
+        self.assertNotIn('"price"', update)
+        self.assertNotIn('"total_stock"', update)
 
     def test_create_reservation_insufficient_stock(self):
         data = {"product": self.product.id, "quantity": 15}
         response = self.client.post(reverse("reservation-list"), data)
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.available_stock, 10)
+        self.assertFalse(Reservation.objects.exists())
 
 # Tests for Order API
 class OrderAPITest(APITestCase):
@@ -146,6 +356,86 @@ class OrderAPITest(APITestCase):
         self.order.refresh_from_db()
         self.assertEqual(self.order.status, "confirmed")
 
+    def test_status_change_audit_written_after_commit(self):
+        data = {"status": "confirmed"}
+        with mock.patch.object(
+            write_audit_logs, "delay", side_effect=OperationalError("broker down")
+        ), self.assertLogs("inventory.tasks", "ERROR"):
+            with self.captureOnCommitCallbacks() as callbacks:
+                self.client.patch(reverse("order-detail", args=[self.order.id]), data)
+            self.assertFalse(AuditLog.objects.exists())
+            # Broker unavailable: the entry is written inline instead of dropped
+            for callback in callbacks:
+                callback()
+        log = AuditLog.objects.get(action="order_status_changed")
+        self.assertEqual(log.get_new_value(), {"status": "confirmed"})
+
+    def test_create_order_queries(self):
+        data = {"product": self.product.id, "quantity": 2}
+        with mock.patch.object(write_audit_logs, "delay", write_audit_logs):
+            with self.captureOnCommitCallbacks(execute=True):
+                # product lookup + INSERT; the audit INSERT runs after commit
+                with self.assertNumQueries(2):
+                    response = self.client.post(reverse("order-list"), data)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        log = AuditLog.objects.get(action="order_created")
+        self.assertEqual(log.new_value["product"], self.product.name)
+
+    def test_list_matches_read_serializer(self):
+        Order.objects.create(product=self.product, quantity=2, status="confirmed")
+        response = self.client.get(reverse("order-list"))
+        orders = Order.objects.select_related("user", "product").order_by("created_at", "id")
+        self.assertEqual(
+            response.json()["results"],
+            json.loads(json.dumps(OrderReadSerializer(orders, many=True).data)),
+        )
+
+    def test_date_filters_include_whole_days(self):
+        today = timezone.localdate().isoformat()
+        yesterday = (timezone.localdate() - timedelta(days=1)).isoformat()
+        url = reverse("order-list")
+        response = self.client.get(url, {"start_date": today, "end_date": today})
+        self.assertEqual(len(response.json()["results"]), 1)
+        response = self.client.get(url, {"end_date": yesterday})
+        self.assertEqual(len(response.json()["results"]), 0)
+
+    def test_date_filters_at_calendar_limits(self):
+        # Bounds that overflow datetime (in UTC) mean "no bound", not a 500
+        url = reverse("order-list")
+        for params in ({"start_date": "0001-01-01"}, {"end_date": "9999-12-31"}):
+            with self.subTest(params):
+                response = self.client.get(url, params)
+                self.assertEqual(response.status_code, status.HTTP_200_OK)
+                self.assertEqual(len(response.json()["results"]), 1)
+        response = self.client.get(url, {"start_date": "9999-12-31"})
+        self.assertEqual(response.json()["results"], [])
+
+    def test_invalid_filter_params_rejected(self):
+        for params in ({"min_total": "abc"}, {"start_date": "2024-13-01"}):
+            with self.subTest(params), self.assertNumQueries(0):
+                response = self.client.get(reverse("order-list"), params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_status_filter_is_case_insensitive(self):
+        Order.objects.create(
+            user=self.user, product=self.product, quantity=1, status="confirmed"
+        )
+        response = self.client.get(reverse("order-list") + "?status=PENDING")
+        self.assertEqual(
+            [row["id"] for row in response.json()["results"]], [self.order.id]
+        )
+
+    def test_highest_value_pages_ties_by_id(self):
+        for _ in range(14):
+            Order.objects.create(user=self.user, product=self.product, quantity=1)
+        ids = []
+        url = reverse("order-list") + "?sort=highest_value"
+        while url:
+            data = self.client.get(url).json()
+            ids += [row["id"] for row in data["results"]]
+            url = data["next"]
+        self.assertEqual(ids, sorted(Order.objects.values_list("id", flat=True), reverse=True))
+
     def test_change_status_invalid(self):
         data = {"status": "delivered"}
         response = self.client.patch(
@@ -153,6 +443,32 @@ class OrderAPITest(APITestCase):
         )
         self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
 
+# Guards against N+1 queries on the list endpoints
+class ListQueryCountTest(APITestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("testuser", "test@example.com", "password")
+        self.client.force_authenticate(user=self.user)
+        for i in range(5):
+            product = Product.objects.create(
+                name=f"P{i}", total_stock=10, available_stock=9, reserved_stock=1
+            )
+            Order.objects.create(user=self.user, product=product, quantity=1)
+            Reservation.objects.create(
+                user=self.user,
+                product=product,
+                quantity=1,
+                expires_at=timezone.now() + timedelta(minutes=10),
+            )
+            AuditLog.objects.create(
+                action="stock_adjusted", object_type="Product", object_id=product.id
+            )
+
+    def test_list_endpoints_use_one_query(self):
+        for name in ("order-list", "reservation-list", "auditlog-list"):
+            with self.subTest(name), self.assertNumQueries(1):
+                response = self.client.get(reverse(name))
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+
 # Tests for AuditLog Model
 class AuditLogTest(TestCase):
     def setUp(self):
@@ -168,3 +484,120 @@ class AuditLogTest(TestCase):
             new_value={"new": "value"},
         )
         self.assertEqual(AuditLog.objects.count(), 1)
+
+    def test_write_audit_logs_uses_single_insert(self):
+        entries = [
+            {"action": "stock_adjusted", "object_type": "Product", "object_id": 1},
+            {"action": "reservation_created", "object_type": "Reservation", "object_id": 1},
+        ]
+        with self.assertNumQueries(1):
+            write_audit_logs(entries)
+        self.assertEqual(AuditLog.objects.count(), 2)
+
+    def test_serializer_exposes_typed_columns_as_values(self):
+        typed = AuditLog.objects.create(
+            action="stock_adjusted",
+            object_type="Product",
+            object_id=1,
+            old_available=10,
+            old_reserved=0,
+            new_available=7,
+            new_reserved=3,
+        )
+        legacy = AuditLog.objects.create(
+            action="stock_adjusted",
+            object_type="Product",
+            object_id=1,
+            old_value={"available_stock": 10, "reserved_stock": 0},
+        )
+        data = AuditLogSerializer(typed).data
+        self.assertEqual(data["old_value"], {"available_stock": 10, "reserved_stock": 0})
+        self.assertEqual(data["new_value"], {"available_stock": 7, "reserved_stock": 3})
+        self.assertNotIn("old_available", data)
+        data = AuditLogSerializer(legacy).data
+        self.assertEqual(data["old_value"], {"available_stock": 10, "reserved_stock": 0})
+        self.assertIsNone(data["new_value"])
+
+    def test_list_omits_payloads_detail_includes_them(self):
+        log = AuditLog.objects.create(
+            action="order_status_changed",
+            object_type="Order",
+            object_id=1,
+            old_status="pending",
+            new_status="confirmed",
+        )
+        newer = AuditLog.objects.create(action="order_created", object_type="Order", object_id=2)
+        self.client.force_login(self.user)
+        rows = self.client.get(reverse("auditlog-list")).json()
+        self.assertEqual([row["id"] for row in rows], [newer.id, log.id])
+        self.assertNotIn("old_value", rows[0])
+        data = self.client.get(reverse("auditlog-detail", args=[log.id])).json()
+        self.assertEqual(data["new_value"], {"status": "confirmed"})
+
+# Tests for expired reservation cleanup
+class CleanupReservationsTest(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user("testuser", "test@example.com", "password")
+        self.product = Product.objects.create(
+            name="Test", total_stock=10, available_stock=4, reserved_stock=6
+        )
+        past = timezone.now() - timedelta(minutes=1)
+        for quantity in (2, 3):
+            Reservation.objects.create(
+                product=self.product, user=self.user, quantity=quantity, expires_at=past
+            )
+        self.active = Reservation.objects.create(
+            product=self.product,
+            user=self.user,
+            quantity=1,
+            expires_at=timezone.now() + timedelta(minutes=10),
+        )
+
+    def assert_cleaned_up(self):
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.available_stock, 9)
+        self.assertEqual(self.product.reserved_stock, 1)
+        self.assertEqual(list(Reservation.objects.values_list("id", flat=True)), [self.active.id])
+        self.assertEqual(AuditLog.objects.filter(action="stock_adjusted").count(), 1)
+        self.assertEqual(AuditLog.objects.filter(action="reservation_expired").count(), 2)
+
+    def test_management_command(self):
+        out = StringIO()
+        call_command("cleanup_reservations", stdout=out)
+        self.assertIn("Cleaned up 2 expired reservations", out.getvalue())
+        self.assert_cleaned_up()
+
+    def test_celery_task(self):
+        cleanup_expired_reservations()
+        self.assert_cleaned_up()
+
+    def test_query_count_independent_of_reservations(self):
+        def expire(count):
+            past = timezone.now() - timedelta(minutes=1)
+            for i in range(count):
+                product = Product.objects.create(
+                    name=f"P{i}", total_stock=2, available_stock=0, reserved_stock=2
+                )
+                for _ in range(2):
+                    Reservation.objects.create(
+                        product=product, user=self.user, quantity=1, expires_at=past
+                    )
+            with CaptureQueriesContext(connection) as queries:
+                cleanup_expired_reservations()
+            return len(queries)
+
+        # Products are locked in one query rather than one per reservation
+        self.assertEqual(expire(1), expire(5))
+
+# Tests for RequestIDMiddleware
+class RequestIDMiddlewareTest(APITestCase):
+    def test_request_id_in_header_and_body(self):
+        response = self.client.get(reverse("order-list"))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["X-Request-ID"], response.json()["request_id"])
+
+    def test_request_id_body_can_be_disabled(self):
+        with self.settings(REQUEST_ID_IN_BODY=False):
+            response = self.client.get(reverse("order-list"))
+        self.assertIn("X-Request-ID", response)
+        self.assertNotIn("request_id", response.json())
@@ -1,9 +1,12 @@
+from functools import cached_property
 from django.shortcuts import render
 from rest_framework import viewsets, serializers
 from rest_framework.authentication import SessionAuthentication
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAuthenticated
+from rest_framework.response import Response
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from django.db import transaction
+from django.db.models import F
 from django.utils import timezone
 from datetime import timedelta
 from .models import Product, Reservation, Order, AuditLog
@@ -14,12 +17,25 @@ from .serializers import (
     OrderReadSerializer,
     OrderWriteSerializer,
     AuditLogSerializer,
+    AuditLogListSerializer,
+    ORDER_LIST_VALUES,
+    order_list_row,
 )
 from .pagination import OrderCursorPagination
 from .filters import OrderFilter
+from .tasks import queue_audit_logs
 from django_filters.rest_framework import DjangoFilterBackend
 
 
+# Mixin resolving the audit log actor once per request (DRF builds a new
+# viewset instance for every request, so the cache never outlives it)
+class AuditActorMixin:
+    @cached_property
+    def audit_actor(self):
+        user = self.request.user
+        return user.email if user.is_authenticated else "System"
+
+
 # ViewSets for Product
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all().order_by("-created_at")
@@ -29,69 +45,99 @@ class ProductViewSet(viewsets.ModelViewSet):
 
 
 # ViewSets for Reservation
-class ReservationViewSet(viewsets.ModelViewSet):
+class ReservationViewSet(AuditActorMixin, viewsets.ModelViewSet):
     queryset = Reservation.objects.select_related("user", "product").order_by("-created_at")
     authentication_classes = [JWTAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
 
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ["list", "retrieve"]:
+            # ReservationReadSerializer only needs str(user) and the product id/name
+            queryset = queryset.only(
+                "id",
+                "quantity",
+                "expires_at",
+                "created_at",
+                "updated_at",
+                "user__username",
+                "product__id",
+                "product__name",
+            )
+        return queryset
+
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
             return ReservationWriteSerializer
         return ReservationReadSerializer
 
     def perform_create(self, serializer):
-        product_id = self.request.data.get("product")
-        quantity = int(self.request.data.get("quantity"))
+        # Both were validated by ReservationWriteSerializer; a missing,
+        # unknown or non-positive value is already a 400
+        product_id = serializer.validated_data["product"].pk
+        quantity = serializer.validated_data["quantity"]
         user = self.request.user
+        actor = self.audit_actor
+
+        now = timezone.now()
+        expires_at = now + timedelta(minutes=10)
 
+        # Only SQL runs inside the transaction; the audit entries are built
+        # after it commits and the product row lock is released
         try:
             with transaction.atomic():
-                product = Product.objects.select_for_update().get(id=product_id)
-                if product.available_stock < quantity:
-                    raise serializers.ValidationError({"error": "Insufficient stock"})
-
-                old_available = product.available_stock
-                old_reserved = product.reserved_stock
-                product.available_stock -= quantity
-                product.reserved_stock += quantity
-                product.save()
-
-                # Audit log for stock adjustment
-                AuditLog.objects.create(
-                    actor=user.email if user.is_authenticated else "System",
-                    action="stock_adjusted",
-                    object_type="Product",
-                    object_id=product.id,
-                    old_value={
-                        "available_stock": old_available,
-                        "reserved_stock": old_reserved,
-                    },
-                    new_value={
-                        "available_stock": product.available_stock,
-                        "reserved_stock": product.reserved_stock,
-                    },
+                # Reserve stock with a single conditional UPDATE; the WHERE clause
+                # does the availability check, so no SELECT ... FOR UPDATE is needed
+                updated = Product.objects.filter(
+                    id=product_id, available_stock__gte=quantity
+                ).update(
+                    available_stock=F("available_stock") - quantity,
+                    reserved_stock=F("reserved_stock") + quantity,
+                    updated_at=now,
                 )
+                if not updated:
+                    if Product.objects.filter(id=product_id).exists():
+                        raise serializers.ValidationError({"error": "Insufficient stock"})
+                    raise Product.DoesNotExist
 
-                # Save the reservation
-                instance = serializer.save(
-                    user=user, expires_at=timezone.now() + timedelta(minutes=10)
-                )
+                # Read back the new stock levels for the audit log
+                product = Product.objects.values(
+                    "id", "name", "available_stock", "reserved_stock"
+                ).get(id=product_id)
 
-                # Audit log for reservation created
-                AuditLog.objects.create(
-                    actor=user.email if user.is_authenticated else "System",
-                    action="reservation_created",
-                    object_type="Reservation",
-                    object_id=instance.id,
-                    new_value={"product": product.name, "quantity": quantity},
-                )
+                # Save the reservation
+                instance = serializer.save(user=user, expires_at=expires_at)
 
         except Product.DoesNotExist:
             raise serializers.ValidationError({"error": "Product not found"})
 
+        # Audit logs for stock adjustment and reservation created,
+        # written by a worker in a single INSERT after commit
+        queue_audit_logs(
+            [
+                {
+                    "actor": actor,
+                    "action": "stock_adjusted",
+                    "object_type": "Product",
+                    "object_id": product["id"],
+                    "old_available": product["available_stock"] + quantity,
+                    "old_reserved": product["reserved_stock"] - quantity,
+                    "new_available": product["available_stock"],
+                    "new_reserved": product["reserved_stock"],
+                },
+                {
+                    "actor": actor,
+                    "action": "reservation_created",
+                    "object_type": "Reservation",
+                    "object_id": instance.id,
+                    "new_value": {"product": product["name"], "quantity": quantity},
+                },
+            ]
+        )
+
 
 # ViewSets for Order
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(AuditActorMixin, viewsets.ModelViewSet):
     """
     OrderViewSet provides CRUD operations for Order objects.
 
@@ -102,38 +148,67 @@ class OrderViewSet(viewsets.ModelViewSet):
     - min_total: Filter orders with total greater than or equal to this value.
     - max_total: Filter orders with total less than or equal to this value.
     - sort: Sort orders by 'newest', 'highest_value'.
+
+    Without a sort, orders are listed oldest first (created_at, id).
     """
 
-    queryset = Order.objects.select_related("product", "user")
+    queryset = Order.objects.select_related("product", "user").order_by("created_at", "id")
     authentication_classes = [JWTAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticatedOrReadOnly]
     pagination_class = OrderCursorPagination
     filter_backends = [DjangoFilterBackend]
     filterset_class = OrderFilter
-    ordering = ["created_at"]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "retrieve":
+            # OrderReadSerializer only needs str(user) and the product id/name
+            queryset = queryset.only(
+                "id",
+                "quantity",
+                "total",
+                "status",
+                "created_at",
+                "updated_at",
+                "user__username",
+                "product__id",
+                "product__name",
+            )
+        return queryset
 
     def get_serializer_class(self):
         if self.action in ["create", "update", "partial_update"]:
             return OrderWriteSerializer
         return OrderReadSerializer
 
+    def list(self, request, *args, **kwargs):
+        # Build list rows straight from .values() instead of running
+        # OrderReadSerializer per row; detail and write actions still use it
+        queryset = self.filter_queryset(self.get_queryset()).values(*ORDER_LIST_VALUES)
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([order_list_row(row) for row in page])
+        return Response([order_list_row(row) for row in queryset])
+
     def perform_create(self, serializer):
+        # DRF already resolved the product during validation; reuse it
+        product = serializer.validated_data["product"]
         instance = serializer.save(user=self.request.user)
         # Audit log for order creation
-        AuditLog.objects.create(
-            actor=(
-                self.request.user.email
-                if self.request.user.is_authenticated
-                else "System"
-            ),
-            action="order_created",
-            object_type="Order",
-            object_id=instance.id,
-            new_value={
-                "product": instance.product.name,
-                "quantity": instance.quantity,
-                "total": str(instance.total),
-            },
+        queue_audit_logs(
+            [
+                {
+                    "actor": self.audit_actor,
+                    "action": "order_created",
+                    "object_type": "Order",
+                    "object_id": instance.id,
+                    "new_value": {
+                        "product": product.name,
+                        "quantity": instance.quantity,
+                        "total": str(instance.total),
+                    },
+                }
+            ]
         )
 
     def perform_update(self, serializer):
@@ -151,23 +226,37 @@ class OrderViewSet(viewsets.ModelViewSet):
 
         if new_status != old_status:
             # Audit log for status change
-            AuditLog.objects.create(
-                actor=(
-                    self.request.user.email
-                    if self.request.user.is_authenticated
-                    else "System"
-                ),
-                action="order_status_changed",
-                object_type="Order",
-                object_id=instance.id,
-                old_value={"status": old_status},
-                new_value={"status": new_status},
+            queue_audit_logs(
+                [
+                    {
+                        "actor": self.audit_actor,
+                        "action": "order_status_changed",
+                        "object_type": "Order",
+                        "object_id": instance.id,
+                        "old_status": old_status,
+                        "new_status": new_status,
+                    }
+                ]
             )
 
 
 # ViewSets for AuditLog
 class AuditLogViewSet(viewsets.ReadOnlyModelViewSet):
-    queryset = AuditLog.objects.all().order_by("-timestamp")
+    # Newest first by primary key: ids follow insertion order, and the
+    # PK index serves the sort
+    queryset = AuditLog.objects.all().order_by("-id")
     serializer_class = AuditLogSerializer
     authentication_classes = [JWTAuthentication, SessionAuthentication]
     permission_classes = [IsAuthenticated]
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            # Leave the JSON and typed payload columns out of list rows
+            queryset = queryset.only(*AuditLogListSerializer.Meta.fields)
+        return queryset
+
+    def get_serializer_class(self):
+        if self.action == "list":
+            return AuditLogListSerializer
+        return AuditLogSerializer
@@ -1,7 +1,18 @@
+import argparse
+import json
 import os
 import sys
+import threading
+import urllib.error
+import urllib.request
 import django
 import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+
+ATTEMPTS = 50
+# Requests in flight at once in HTTP mode. Kept below the dev server's listen
+# backlog (runserver queues 10 connections) so no connection is refused.
+HTTP_CONCURRENCY = 8
 
 
 # Chaos test script to simulate concurrent purchase attempts
@@ -12,26 +23,131 @@ def setup_django():
     django.setup()
 
 
-# Function to attempt a purchase
-def attempt_purchase(product_id, user_id):
-    setup_django()
-    from django.contrib.auth.models import User
+# POST a JSON payload and return (status code, decoded body)
+def post_json(url, payload, token=None):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"JWT {token}"
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers=headers, method="POST"
+    )
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            return response.status, json.loads(response.read())
+    except urllib.error.HTTPError as e:
+        return e.code, None
+    except OSError:
+        # Connection refused/reset: reported as an error, not a rejection
+        return None, None
+
+
+# Fire concurrent reservation requests at the running API from a thread pool.
+# Threads spend their time waiting on HTTP, so they all share one process.
+def run_http(base_url, product_id):
+    status, body = post_json(
+        f"{base_url}/api/token/", {"username": "testuser", "password": "password"}
+    )
+    if status != 200:
+        sys.exit(
+            f"Could not obtain a token from {base_url} (HTTP {status}). "
+            "Is the server running (python manage.py runserver)?"
+        )
+    token = body["access"]
+
+    url = f"{base_url}/api/reservations/"
+    # The first wave waits here so its requests hit the server together
+    start = threading.Barrier(HTTP_CONCURRENCY)
+
+    def reserve(attempt):
+        if attempt < HTTP_CONCURRENCY:
+            start.wait()
+        return post_json(url, {"product": product_id, "quantity": 1}, token)[0]
+
+    with ThreadPoolExecutor(max_workers=HTTP_CONCURRENCY) as executor:
+        statuses = list(executor.map(reserve, range(ATTEMPTS)))
+
+    # Only a 400 is a correct stock rejection; 5xx and connection errors
+    # are reported separately so they can't pass for one
+    return [
+        "success" if status == 201 else "fail" if status == 400 else "error"
+        for status in statuses
+    ]
+
+
+# Contention mode: one process per attempt, calling the ORM directly
+def run_processes(product_id, user_id):
+    from django.db import connections
+
+    # Don't let forked workers inherit the parent's database connection
+    connections.close_all()
+
+    # 50 parallel processes, each bootstrapping Django once
+    with multiprocessing.Pool(processes=ATTEMPTS, initializer=setup_django) as pool:
+        return pool.starmap(
+            attempt_purchase, [(product_id, user_id) for _ in range(ATTEMPTS)]
+        )
+
+
+# Batch mode: reserve n units for one user in a single transaction, granting
+# what stock allows. One lock acquisition instead of n serialized ones, so it
+# measures the database's throughput ceiling rather than lock contention.
+def attempt_batch(product_id, user_id, n):
     from django.db import transaction
+    from django.db.models import F
+    from django.utils import timezone
+    from datetime import timedelta
+    from inventory.models import Product, Reservation
+
+    with transaction.atomic():
+        available = (
+            Product.objects.select_for_update()
+            .values_list("available_stock", flat=True)
+            .get(id=product_id)
+        )
+        granted = min(n, available)
+        if granted:
+            Product.objects.filter(id=product_id).update(
+                available_stock=F("available_stock") - granted,
+                reserved_stock=F("reserved_stock") + granted,
+            )
+            expires_at = timezone.now() + timedelta(minutes=10)
+            Reservation.objects.bulk_create(
+                [
+                    Reservation(
+                        product_id=product_id,
+                        user_id=user_id,
+                        quantity=1,
+                        expires_at=expires_at,
+                    )
+                    for _ in range(granted)
+                ],
+                batch_size=500,
+            )
+    return ["success"] * granted + ["fail"] * (n - granted)
+
+
+# Function to attempt a purchase (Django is set up once per worker by the pool initializer)
+def attempt_purchase(product_id, user_id):
+    from django.db import connection, transaction
+    from django.db.models import F
     from django.utils import timezone
     from datetime import timedelta
     from inventory.models import Product, Reservation
 
     try:
         with transaction.atomic():
-            prod = Product.objects.select_for_update().get(id=product_id)
-            if prod.available_stock >= 1:
-                prod.available_stock -= 1
-                prod.reserved_stock += 1
-                prod.save()
-                user = User.objects.get(id=user_id)
+            # Conditional UPDATE: the availability check and the decrement are
+            # one statement, so no SELECT ... FOR UPDATE is needed
+            reserved = Product.objects.filter(
+                id=product_id, available_stock__gte=1
+            ).update(
+                available_stock=F("available_stock") - 1,
+                reserved_stock=F("reserved_stock") + 1,
+            )
+            if reserved:
                 Reservation.objects.create(
-                    product=prod,
-                    user=user,
+                    product_id=product_id,
+                    user_id=user_id,
                     quantity=1,
                     expires_at=timezone.now() + timedelta(minutes=10),
                 )
@@ -40,9 +156,33 @@ def attempt_purchase(product_id, user_id):
                 return "fail"
     except Exception as e:
         return "fail"
+    finally:
+        # Reuse the worker's connection for its next attempt (CONN_MAX_AGE)
+        # unless it is broken or past its age
+        connection.close_if_unusable_or_obsolete()
 
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Fire concurrent reservations at one product with 5 units in stock."
+    )
+    parser.add_argument(
+        "--url",
+        default="http://127.0.0.1:8000",
+        help="Base URL of the running API server (default: %(default)s)",
+    )
+    parser.add_argument(
+        "--contention-mode",
+        action="store_true",
+        help="Bypass HTTP and hit the ORM from 50 processes to stress row-lock contention",
+    )
+    parser.add_argument(
+        "--batch",
+        action="store_true",
+        help="Bypass HTTP and reserve all 50 units in one transaction to measure raw throughput",
+    )
+    args = parser.parse_args()
+
     setup_django()
 
     from django.contrib.auth.models import User
@@ -64,21 +204,27 @@ if __name__ == "__main__":
     product.total_stock = 5
     product.available_stock = 5
     product.reserved_stock = 0
-    product.save()
+    product.save(update_fields=["total_stock", "available_stock", "reserved_stock"])
 
-    with multiprocessing.Pool(processes=50) as pool:  # 50 parallel processes
-        results = pool.starmap(
-            attempt_purchase, [(product.id, user.id) for _ in range(50)]
-        )
+    if args.batch:
+        results = attempt_batch(product.id, user.id, ATTEMPTS)
+    elif args.contention_mode:
+        results = run_processes(product.id, user.id)
+    else:
+        results = run_http(args.url.rstrip("/"), product.id)
 
     success_count = results.count("success")
     fail_count = results.count("fail")
+    error_count = results.count("error")
 
     product.refresh_from_db()
 
     print(f"Succeeded: {success_count}")
     print(f"Failed: {fail_count}")
+    if error_count:
+        print(f"Errors (5xx / connection): {error_count}")
     print(f"Final available_stock: {product.available_stock}")
+    print(f"Final reserved_stock: {product.reserved_stock}")
     print("Deleting test data...")
 
     # Clean up test data